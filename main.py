@@ -41,7 +41,7 @@ def main():
 
         validate_and_change_directory()
 
-        loaded_objects = {}
+        loaded_objects = DiagramsDict()
 
         while True:
             user_choice = prompt_user_menu()
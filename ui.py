@@ -1,5 +1,4 @@
 
-import os
 import sys
 
 try:
@@ -25,12 +24,29 @@ def main_menu():
     print("4. Display Diagram Info")
     print("5. Search")
     print("6. Statistics")
-    print("7. Exit")
+    print("7. Sync Folder")
+    print("8. Split / Sample Dataset")
+    print("9. Exit")
 
 def search_sub_menu_five():
     print("\n===== SEARCH SUB-MENU =====")
     print("5.1. Find by type")
     print("5.2. Find by dimension")
+    print("5.3. Find similar diagrams")
+    print("5.4. Find by file name")
+    print("0. Return to Main Menu")  # Option to go back
+
+def statistics_sub_menu_six():
+    print("\n===== STATISTICS SUB-MENU =====")
+    print("6.1. General statistics")
+    print("6.2. Class co-occurrence")
+    print("6.3. Memory report")
+    print("0. Return to Main Menu")  # Option to go back
+
+def split_sub_menu_eight():
+    print("\n===== SPLIT / SAMPLE SUB-MENU =====")
+    print("8.1. Stratified split")
+    print("8.2. Class-balanced sample")
     print("0. Return to Main Menu")  # Option to go back
 
 def get_valid_user_int(prompt,default=None) -> int:
@@ -55,36 +71,51 @@ def get_valid_user_int(prompt,default=None) -> int:
 def prompt_user_menu() -> int:
     while True:
         main_menu()
-        choice = get_valid_user_int("\nEnter an option (1-7): ")
+        choice = get_valid_user_int("\nEnter an option (1-9): ")
 
-        if choice < 1 or choice > 7:
-            print("\nInvalid option. Please select a number between 1 and 7.")
+        if choice < 1 or choice > 9:
+            print("\nInvalid option. Please select a number between 1 and 9.")
             continue
 
         return choice
 
-def complete_xml_factory(diagrams_dict=None):
+def complete_name_factory(name_index):
+    """Build a readline completer over a prefix index (any object with a complete(prefix) method)."""
+    matches = []
+
     def completer(text, state):
-        if diagrams_dict is not None:
-            files = [f for f in diagrams_dict.keys() if f.startswith(text)]
-        else:
-            files = [f for f in os.listdir() if f.endswith(".xml") and f.startswith(text)]
-        return files[state] if state < len(files) else None
+        nonlocal matches
+        # readline asks for state 0, 1, 2... until None: query the index once per Tab
+        if state == 0:
+            matches = name_index.complete(text)
+        return matches[state] if state < len(matches) else None
     return completer
 
-# Prompt the user for a filename with autocompletion
-# If diagrams_dict is not None, it will be used to check if the file is already loaded
-# If diagrams_dict is None, it will just return the filename without checking from the directory
-def prompt_user_file_name(diagrams_dict=None) -> str:
-    readline.set_completer(complete_xml_factory(diagrams_dict))
+def input_with_completion(prompt, name_index=None) -> str:
+    """Read a line with Tab completion over name_index, if one is given."""
+    if name_index is None:
+        return input(prompt)
+
+    # Names may contain spaces and dashes, so the whole line is completed
+    previous_delims = readline.get_completer_delims()
+    readline.set_completer_delims("")
+    readline.set_completer(complete_name_factory(name_index))
     readline.parse_and_bind("tab: complete")
 
-    user_input = input("\nEnter the name of the XML file you want to load: ").strip()
+    try:
+        return input(prompt)
+    finally:
+        readline.set_completer(None)
+        readline.set_completer_delims(previous_delims)
 
-    # Optionally disable completer afterward by setting it to None
-    readline.set_completer(None)
+# Prompt the user for a filename with autocompletion
+# name_index holds the names offered on Tab: the files of the directory when loading,
+# the loaded diagrams otherwise. Without it, no completion is offered.
+def prompt_user_file_name(name_index=None) -> str:
+    return input_with_completion("\nEnter the name of the annotation file: ", name_index).strip()
 
-    return user_input
+def prompt_user_name_pattern(name_index=None) -> str:
+    return input_with_completion("\nEnter a file name prefix or glob pattern (e.g. IMG_2021*): ", name_index).strip()
 
 def prompt_user_bool_option(prompt):
     user_input = input(prompt).strip().lower()
@@ -96,9 +127,9 @@ def prompt_user_bool_option(prompt):
         # Any other input (including blank) is treated as "all"
         return None
 
-def prompt_user_object_type():
+def prompt_user_object_type(name_index=None):
     while True:
-        user_input = input("Enter the type of object you want to search for: ").strip()
+        user_input = input_with_completion("Enter the type of object you want to search for: ", name_index).strip()
         if user_input:
             return user_input
         else:
@@ -132,6 +163,22 @@ def display_diagrams(data, prompt="Diagrams", error_message="No diagrams found")
 
     print("=" * 60 + "\n")
 
+def display_similar_diagrams(neighbours, file_name):
+    """Display the diagrams closest to file_name, ordered by distance between their layout feature vectors."""
+    print("\n" + "=" * 60)
+    print(f"Diagrams similar to {file_name}".center(60))
+    print("=" * 60)
+
+    if not neighbours:
+        print("\n" + "[!] No other diagram loaded in memory.".center(60) + "\n")
+        print("=" * 60 + "\n")
+        return
+
+    print()
+    for i, (filename, distance) in enumerate(neighbours, start=1):
+        print(f"  {i:>2}. {filename:<40} distance: {distance:.3f}")
+    print("\n" + "=" * 60 + "\n")
+
 """
 This function displays the information of a specific diagram that is loaded in memory.
 It takes a dictionary of diagrams and the filename as input.
@@ -257,6 +304,161 @@ def display_statistics(diagrams_dict):
 
     print("\n" + separator + "\n")
 
+def display_sync_summary(summary):
+    """Display what a folder sync changed in memory."""
+    total_width = 60
+    separator = "=" * total_width
+
+    print("\n" + separator)
+    print("Sync Folder".center(total_width))
+    print(separator + "\n")
+
+    print(f"{'Added':<30}: {len(summary['added'])}")
+    print(f"{'Reloaded':<30}: {len(summary['reloaded'])}")
+    print(f"{'Removed':<30}: {len(summary['removed'])}")
+    print(f"{'Failed':<30}: {len(summary['failed'])}")
+
+    for filename in summary['reloaded']:
+        print(f"    ~ {filename}")
+    for filename in summary['removed']:
+        print(f"    - {filename}")
+    for filename, error in summary['failed']:
+        print(f"    ! {filename}: {error}")
+
+    if not any(summary.values()):
+        print("\n" + "Everything is up to date.".center(total_width))
+
+    print("\n" + separator + "\n")
+
+def display_cooccurrence(class_stats, top_k=10, object_type=None):
+    """Display per-class totals and the most frequent pairs of object types found in the same diagram."""
+    total_width = 60
+    separator = "=" * total_width
+
+    print("\n" + separator)
+    print("Class Co-occurrence".center(total_width))
+    print(separator + "\n")
+
+    print(f"{'Object Type':<24}{'Objects':>10}{'Diagrams':>12}{'% Diagrams':>14}")
+    print("-" * total_width)
+    for name in class_stats.present_classes():
+        cid = class_stats.class_ids[name]
+        nb_diagrams = class_stats.diagram_totals[cid]
+        share = 100 * nb_diagrams / class_stats.nb_diagrams if class_stats.nb_diagrams else 0
+        print(f"{name:<24}{class_stats.object_totals[cid]:>10}{nb_diagrams:>12}{share:>13.1f}%")
+
+    pairs = class_stats.top_pairs(k=top_k, with_class=object_type)
+    title = f"Top pairs with '{object_type}'" if object_type else "Top pairs"
+    print(f"\n{title}:")
+
+    if not pairs:
+        print("    [!] No two object types appear in the same diagram.")
+    for first, second, count in pairs:
+        # P(second | first) and P(first | second) tell how strongly each side implies the other
+        p_second = class_stats.conditional_frequency(first, second)
+        p_first = class_stats.conditional_frequency(second, first)
+        print(f"    {first} + {second}: {count} diagram(s)")
+        print(f"        P({second} | {first}) = {p_second:.2f}    P({first} | {second}) = {p_first:.2f}")
+
+    print("\n" + separator + "\n")
+
+def display_splits(splits, split_sizes, manifest_paths):
+    """Display the size of each split and its class distribution (share of its objects in each class)."""
+    total_width = 60
+    separator = "=" * total_width
+
+    print("\n" + separator)
+    print("Split / Sample".center(total_width))
+    print(separator + "\n")
+
+    names = list(splits)
+    class_names = sorted({class_name for counts in splits.values() for class_name in counts})
+
+    print(f"{'':<20}" + "".join(f"{name:>12}" for name in names))
+    print(f"{'Diagrams':<20}" + "".join(f"{split_sizes[name]:>12}" for name in names))
+    print("-" * total_width)
+
+    # A well stratified split shows about the same percentage on every row
+    object_totals = {name: sum(splits[name].values()) or 1 for name in names}
+    for class_name in class_names:
+        row = "".join(f"{100 * splits[name].get(class_name, 0) / object_totals[name]:>11.1f}%" for name in names)
+        print(f"{class_name:<20}{row}")
+
+    print("\nManifests written:")
+    for path in manifest_paths:
+        print(f"    {path}")
+
+    print("\n" + separator + "\n")
+
+def format_bytes(nb_bytes):
+    """Format a number of bytes with a binary unit (B, KiB, MiB, GiB)."""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(nb_bytes) < 1024:
+            return f"{nb_bytes:.0f} {unit}" if unit == "B" else f"{nb_bytes:.1f} {unit}"
+        nb_bytes /= 1024
+    return f"{nb_bytes:.1f} GiB"
+
+def display_memory_report(report, top_n=10):
+    """Display the estimated memory footprint of the loaded diagrams and of the indexes built on them."""
+    total_width = 60
+    separator = "=" * total_width
+
+    diagrams_total = report["diagrams_total"]
+    objects_total = report["objects_total"]
+    indexes_total = sum(report["indexes"].values())
+
+    print("\n" + separator)
+    print("Memory Report".center(total_width))
+    print(separator + "\n")
+
+    print(f"{'Diagrams':<30}: {format_bytes(diagrams_total)}")
+    print(f"{'Indexes':<30}: {format_bytes(indexes_total)}")
+    print(f"{'Total':<30}: {format_bytes(diagrams_total + indexes_total)}")
+    print(f"{'Bytes per Object':<30}: {diagrams_total / objects_total if objects_total else 0:.0f}\n")
+
+    print("Per Object Type:")
+    for name, (nb_bytes, count) in sorted(report["per_class"].items(), key=lambda item: item[1][0], reverse=True):
+        print(f"    {name:<20}: {format_bytes(nb_bytes):>10} for {count} object(s), {nb_bytes / count:.0f} B each")
+
+    print("\nPer Folder:")
+    for folder, (nb_bytes, count) in sorted(report["per_folder"].items(), key=lambda item: item[1][0], reverse=True):
+        print(f"    {folder or '(none)':<20}: {format_bytes(nb_bytes):>10} for {count} diagram(s)")
+
+    print("\nPer Index:")
+    for name, nb_bytes in report["indexes"].items():
+        print(f"    {name:<20}: {format_bytes(nb_bytes):>10}")
+
+    print("\nHeaviest Diagrams:")
+    for i, (filename, nb_bytes, count) in enumerate(report["per_diagram"][:top_n], start=1):
+        print(f"  {i:>2}. {filename:<32}{format_bytes(nb_bytes):>10}  ({count} object(s))")
+
+    print("\n" + separator + "\n")
+
+def display_load_profile(profile):
+    """Display the memory allocated during and held after each stage of loading, as measured by tracemalloc."""
+    total_width = 60
+    separator = "=" * total_width
+
+    print("\n" + separator)
+    print("Load Memory Profile (tracemalloc)".center(total_width))
+    print(separator + "\n")
+
+    print(f"{'Files Profiled':<30}: {profile['nb_files']}")
+    print(f"{'Diagrams Loaded':<30}: {profile['nb_diagrams']}")
+
+    # Allocated: reached during the stage. Held: still in use by the loading when the stage ends.
+    print(f"\n    {'Stage':<20}{'Allocated':>14}{'Held After':>16}")
+    for stage, nb_bytes in profile["allocated"].items():
+        print(f"    {stage[0].upper() + stage[1:]:<20}{format_bytes(nb_bytes):>14}{format_bytes(profile['held'][stage]):>16}")
+    print()
+    print(f"{'Peak':<30}: {format_bytes(profile['peak'])}")
+    print(f"{'Retained After Loading':<30}: {format_bytes(profile['retained'])}")
+
+    for filename, error in profile["failed"]:
+        print(f"    ! {filename}: {error}")
+
+    print("\n" + separator + "\n")
+
 
 if __name__ == "__main__":
     # Prompt the user for a choice and display it